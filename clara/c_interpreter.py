@@ -4,10 +4,12 @@ C interpreter
 
 # Python imports
 import math
+import operator
 import sys
 
 # clara imports
 from .interpreter import Interpreter, addlanginter, RuntimeErr, UndefValue
+from .model import Op
 
 
 def libcall(*args):
@@ -42,6 +44,19 @@ def libcall(*args):
     return dec
 
 
+# Implementations of binary operators (except short-circuit '&&' and '||')
+BINARY_FNCS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': operator.truediv, '%': operator.mod,
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+    '^': operator.xor, '&': operator.and_, '|': operator.or_,
+}
+
+# Implementations of unary operators (except '!')
+UNARY_FNCS = {'-': operator.neg, '+': operator.pos}
+
+
 class CInterpreter(Interpreter):
 
     BINARY_OPS = {'+', '-', '*', '/', '%', '<', '<=', '>', '>=', '==', '!=',
@@ -49,7 +64,10 @@ class CInterpreter(Interpreter):
 
     UNARY_OPS = {'!', '-', '+'}
 
-    def execute_Const(self, c, mem):
+    # Ops that always return a newly built array
+    FRESH_ARRAY_OPS = {'ArrayCreate', 'ArrayInit', 'ArrayAssign'}
+
+    def parse_const(self, c):
 
         # Undef
         if c.value == '?':
@@ -90,16 +108,15 @@ class CInterpreter(Interpreter):
 
         x = self.tonumeric(self.execute(x, mem))
 
-        if op == '-':
-            res = -x
-        elif op == '+':
-            res = +x
-        elif op == '!':
-            res = not x
-        else:
-            assert False, "Unknown unary op: '%s'" % (op,)
+        # Negation gives 1/0 (as other logical ops), while '-' and '+' keep
+        # the numeric type
+        if op == '!':
+            return 0 if x else 1
 
-        return self.tonumeric(res)
+        fnc = UNARY_FNCS.get(op)
+        assert fnc is not None, "Unknown unary op: '%s'" % (op,)
+
+        return fnc(x)
 
     def execute_BinaryOp(self, op, x, y, mem):
 
@@ -120,38 +137,10 @@ class CInterpreter(Interpreter):
 
         x, y = self.togreater(x, y)
         
-        if op == '+':
-            res = x + y
-        elif op == '-':
-            res = x - y
-        elif op == '*':
-            res = x * y
-        elif op == '/':
-            res = x / y
-        elif op == '%':
-            res = x % y
-        elif op == '==':
-            res = x == y
-        elif op == '!=':
-            res = x != y
-        elif op == '<':
-            res = x < y
-        elif op == '<=':
-            res = x <= y
-        elif op == '>':
-            res = x > y
-        elif op == '>=':
-            res = x >= y
-        elif op == '^':
-            res = x ^ y
-        elif op == '&':
-            res = x & y
-        elif op == '|':
-            res = x | y
-        else:
-            assert False, 'Unknown binary op: %s' % (op,)
-
-        return res
+        fnc = BINARY_FNCS.get(op)
+        assert fnc is not None, 'Unknown binary op: %s' % (op,)
+
+        return fnc(x, y)
 
     def execute_cast(self, c, mem):
 
@@ -162,7 +151,7 @@ class CInterpreter(Interpreter):
 
     def execute_ArrayCreate(self, ac, mem):
         x = int(self.tonumeric(self.execute(ac.args[0], mem)))
-        return [None for _ in range(x)]
+        return [None] * x
 
     def execute_ArrayInit(self, ai, mem):
         return [self.execute(x, mem) for x in ai.args]
@@ -172,7 +161,12 @@ class CInterpreter(Interpreter):
         a = self.execute(aa.args[0], mem)
         if not isinstance(a, list):
             raise RuntimeErr("Expected 'list', got '%s'" % (a,))
-        a = list(a)
+
+        # Values in memory are shared with the trace (see 'procmem'), so
+        # copy the array, unless it was just built by the array expression
+        arr = aa.args[0]
+        if not (isinstance(arr, Op) and arr.name in self.FRESH_ARRAY_OPS):
+            a = list(a)
         
         i = int(self.tonumeric(self.execute(aa.args[1], mem)))
         if i < 0 or i >= len(a):
@@ -233,8 +227,12 @@ class CInterpreter(Interpreter):
         return math.exp(x)
 
     def tonumeric(self, v):
+        # Exact type checks first (the common case)
+        t = type(v)
+        if t is int or t is float:
+            return v
 
-        if v in [True, False]:
+        if t is bool:
             return 1 if v else 0
 
         if not isinstance(v, (int, float)):
@@ -244,6 +242,10 @@ class CInterpreter(Interpreter):
 
     def togreater(self, x, y):
 
+        # Nothing to promote when types are the same (the common case)
+        if type(x) is type(y):
+            return x, y
+
         if isinstance(x, float):
             return x, float(y)
 
@@ -257,24 +259,23 @@ class CInterpreter(Interpreter):
         if isinstance(val, UndefValue):
             return val
 
+        # int() and float() already map bools to 1/0
         if t == 'int':
-            if val in [True, False]:
-                val = 1 if val else 0
             return int(val)
 
         if t == 'float':
-            if val in [True, False]:
-                val = 1.0 if val else 0.0
             return float(val)
 
         if t == 'char':
-            if val in [True, False]:
-                val = 1 if val else 0
             return int(val) % 128
 
         if t.endswith('[]'):
             st = t[:-2]
             if isinstance(val, list):
+                if st == 'char':
+                    # Inlined 'convert(x, st)' (int(True) == 1 covers bools)
+                    return [x if x is None or isinstance(x, UndefValue)
+                            else int(x) % 128 for x in val]
                 return [x if x is None else self.convert(x, st) for x in val]
             raise RuntimeErr("Expected list, got '%s'" % (val,))
 
@@ -432,9 +432,11 @@ class CParser(Parser):
 be a format" % (node.coord.line,))
                 fmt = Const('?', line=node.coord.line)
 
-        fmt.value = fmt.value.replace('%lf', '%f')
-        fmt.value = fmt.value.replace('%ld', '%d')
-        fmt.value = fmt.value.replace('%lld', '%d')
+        # Length modifiers are rare, so most formats are left untouched
+        if '%l' in fmt.value:
+            fmt.value = fmt.value.replace('%lf', '%f')
+            fmt.value = fmt.value.replace('%ld', '%d')
+            fmt.value = fmt.value.replace('%lld', '%d')
 
         expr = Op('StrAppend', Var(VAR_OUT),
                   Op('StrFormat', fmt, *args, line=node.coord.line),
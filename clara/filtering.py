@@ -1,32 +1,61 @@
+from multiprocessing import Pool, cpu_count
+
 from clara.interpreter import RuntimeErr
 
 
+def check_program(task):
+    prog, inter, tests, entryfnc, filter_regex, timeout, verbose = task
+
+    I = inter(timeout=timeout, entryfnc=entryfnc, filter_regex=filter_regex, track=True,
+              fulltrace=False)
+
+    # Messages are printed by the caller, so that they stay in order when
+    # programs are checked in parallel
+    msgs = []
+
+    if verbose:
+        msgs.append(prog.name)
+
+    for test in tests:
+        try:
+            I.run(prog, ins=test['ins'], args=test['args'], entryfnc=entryfnc)
+        except RuntimeErr as e:
+            return False, msgs
+
+        if verbose:
+            msgs.append("OUTPUT: " + I.output)
+            msgs.append("EXPECTED: " + test['out'])
+        if test['out'] is not None and test['out'] not in I.output:
+            return False, msgs
+
+        if test['ret'] is not None and I.retval != test['ret']:
+            return False, msgs
+
+    return True, msgs
+
+
 class Filtering(object):
-    def filter(self, progs, inter, tests, entryfnc=None, filter_regex='.*', timeout=30):
-        I = inter(timeout=timeout, entryfnc=entryfnc, filter_regex=filter_regex, track=True)
+    def filter(self, progs, inter, tests, entryfnc=None, filter_regex='.*', timeout=30,
+               poolsize=None, verbose=False):
+        tasks = [(prog, inter, tests, entryfnc, filter_regex, timeout, verbose)
+                 for prog in progs]
+
+        # Programs are checked independently of each other, so split them
+        # over a pool of processes (unless there is nothing to split)
+        if poolsize == 1 or len(tasks) <= 1:
+            results = list(map(check_program, tasks))
+
+        else:
+            chunksize = max(1, len(tasks) // (4 * (poolsize or cpu_count())))
+
+            with Pool(processes=poolsize) as pool:
+                results = pool.map(check_program, tasks, chunksize)
 
         correct_progs = []
 
-        for prog in progs:
-            print(prog.name)
-            correct = True
-
-            for test in tests:
-                try:
-                    I.run(prog, ins=test['ins'], args=test['args'], entryfnc=entryfnc)
-                except RuntimeErr as e:
-                    correct = False
-                    break
-
-                print("OUTPUT: " + I.output)
-                print("EXPECTED: " + test['out'])
-                if test['out'] is not None and test['out'] not in I.output:
-                    correct = False
-                    break
-
-                if test['ret'] is not None and I.retval != test['ret']:
-                    correct = False
-                    break
+        for prog, (correct, msgs) in zip(progs, results):
+            for msg in msgs:
+                print(msg)
 
             if correct:
                 correct_progs.append(prog)
@@ -7,11 +7,20 @@ import re
 import time
 
 from copy import deepcopy
+from itertools import islice
 
 # clara imports
 from .common import UnknownLanguage
 from .model import Program, VAR_IN, VAR_OUT, VAR_RET, VAR_COND, Var, Op
-from .model import prime, unprime, isprimed
+from .model import prime
+
+
+VAR_RET_PRIMED = prime(VAR_RET)
+
+# Escape sequences replaced by 'unescape_chars'
+UNESCAPE_RE = re.compile(r'\\([tbnr\'"\\])')
+UNESCAPE_CHARS = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r',
+                  '\'': '\'', '"': '"', '\\': '\\'}
 
 
 class RuntimeErr(Exception):
@@ -34,11 +43,19 @@ def isundef(x):
 class Interpreter(object):
     DEFAULT_RETURN = UndefValue()
 
-    def __init__(self, timeout=None, entryfnc='main',  filter_regex='.*', track=True):
+    # Timeout is checked once every TIMEOUT_TICKS executed nodes (and on
+    # every step of a function), must be a power of two
+    TIMEOUT_TICKS = 1024
+
+    def __init__(self, timeout=None, entryfnc='main',  filter_regex='.*', track=True,
+                 fulltrace=True):
         self.timeout = timeout
         self.starttime = None
+        self.deadline = None
+        self.ticks = 0
         self.entryfnc = entryfnc
         self.filter_regex = filter_regex
+        self.filter_re = re.compile(filter_regex)
 
         self.fnc = None
         self.loc = None
@@ -49,10 +66,31 @@ class Interpreter(object):
 
         self.track = track
 
+        # If False, only the last state is kept in the trace (enough for
+        # the return value and output, but not for matching)
+        self.fulltrace = fulltrace
+
         if self.track:
             self.output = ''
             self.retval = None
 
+        # Cache of primed names (var -> var') and the reverse (var' -> var)
+        self.primed = {}
+        self.unprimed = {}
+
+        # Dispatch table: name -> bound 'execute_<name>' method
+        self._dispatch = {}
+        for name in dir(type(self)):
+            if name.startswith('execute_'):
+                self._dispatch[name[len('execute_'):]] = getattr(self, name)
+
+    def primevar(self, var):
+        varp = self.primed.get(var)
+        if varp is None:
+            varp = self.primed[var] = prime(var)
+            self.unprimed[varp] = var
+        return varp
+
     def getfnc(self, name):
 
         return self.prog.getfnc(name)
@@ -105,27 +143,32 @@ class Interpreter(object):
                 mem[var] = self.convert(a, t)
 
         self.starttime = time.time()
+        if self.timeout:
+            self.deadline = self.starttime + self.timeout
 
         res = self.execute(fnc, mem)
 
         if self.track:
-            self.retval = res[-1][2].get('$ret\'')
+            self.retval = res[-1][2].get(VAR_RET_PRIMED)
 
         self.prog = None
 
         return res
 
+    def checktimeout(self):
+        if self.deadline and time.time() > self.deadline:
+            raise RuntimeErr(
+                'Timeout (%.3f)' % (round(time.time() - self.starttime, 3),))
+
     def execute(self, obj, mem):
 
         # Check for timeout
-        if self.timeout and self.starttime \
-                and (time.time() - self.starttime > self.timeout):
-            raise RuntimeErr(
-                'Timeout (%.3f)' % (round(time.time() - self.starttime, 3),))
+        self.ticks += 1
+        if not (self.ticks & (self.TIMEOUT_TICKS - 1)):
+            self.checktimeout()
 
-        # Get name of the object to be executed
-        name = obj.__class__.__name__
-        meth = getattr(self, 'execute_%s' % (name,))
+        # Get method for the object to be executed
+        meth = self._dispatch[type(obj).__name__]
 
         try:
             return meth(obj, mem)
@@ -138,26 +181,45 @@ class Interpreter(object):
         self.fnc = fnc.name
         self.loc = fnc.initloc
 
+        # Local names for everything used on each step
+        execute = self.execute
+        convert = self.convert
+        procmem = self.procmem
+        trace = self.trace
+        addtrace = trace.append
+        fulltrace = self.fulltrace
+        types = fnc.types
+        primed = self.primed
+
+        # Read the location tables directly: Function.exprs/numtrans/trans
+        # copy and check on each call, and the function does not change here
+        locexprs = fnc.locexprs
+        loctrans = fnc.loctrans
+
         while True:
+            self.checktimeout()
 
             # Execute all exprs
-            for (var, expr) in fnc.exprs(self.loc):
-                val = self.execute(expr, mem)
+            for (var, expr) in locexprs[self.loc]:
+                val = execute(expr, mem)
 
                 if var == VAR_COND:
                     val = not not val
 
-                varp = prime(var)
+                varp = primed.get(var) or self.primevar(var)
                 vtype = (fnc.rettype if var == VAR_RET
-                         else (fnc.gettype(var) or '*'))
-                mem[varp] = self.convert(val, vtype)
+                         else (types.get(var) or '*'))
+                mem[varp] = convert(val, vtype)
 
                 if var == VAR_RET and not isundef(val):
                     break
 
             # Save memory
-            (newmem, mem) = self.procmem(mem)
-            self.trace.append((self.fnc, self.loc, mem))
+            (newmem, mem) = procmem(mem)
+            if fulltrace or not trace:
+                addtrace((self.fnc, self.loc, mem))
+            else:
+                trace[-1] = (self.fnc, self.loc, mem)
             mem = newmem
 
             # Check return
@@ -165,34 +227,47 @@ class Interpreter(object):
                 break
 
             # Find new location
-            numtrans = fnc.numtrans(self.loc)
-            if numtrans == 0:  # Done
+            trans = loctrans[self.loc]
+            loctrue, locfalse = trans[True], trans[False]
+            if loctrue is None and locfalse is None:  # Done
                 break
 
-            elif numtrans == 1:  # Trivially choose True
-                self.loc = fnc.trans(self.loc, True)
+            elif loctrue is None or locfalse is None:  # Trivially choose True
+                self.loc = loctrue
 
             else:
-                self.loc = fnc.trans(self.loc, mem.get(VAR_COND))
+                self.loc = trans[mem.get(VAR_COND)]
 
         return self.trace
 
     def procmem(self, mem):
-        newmem = dict()
+        # Values are shared between the trace and the new memory (no copy):
+        # executors never update a value in place, but build a new one
+        # instead (e.g., ArrayAssign copies the array before assigning and
+        # sort returns a sorted copy)
+        primed, unprimed = self.primed, self.unprimed
 
-        for var, val in list(mem.items()):
-            if isprimed(var):
-                var = unprime(var)
-                newmem[var] = deepcopy(val)
-            else:
-                varp = prime(var)
-                if varp not in mem:
-                    newmem[var] = deepcopy(val)
-                    mem[varp] = deepcopy(val)
+        # Old values and the values assigned in this step
+        newmem = {var: val for var, val in mem.items() if var not in unprimed}
+        post = {unprimed[var]: val for var, val in mem.items() if var in unprimed}
+
+        # Variables not assigned in this step keep their value
+        for var, val in newmem.items():
+            varp = primed.get(var) or self.primevar(var)
+            if varp not in mem:
+                mem[varp] = val
+
+        newmem.update(post)
 
         return newmem, mem
 
     def execute_Op(self, op, mem):
+        # Named operations first; operator symbols ('+', '&&', '[]', ...)
+        # are never names of execute_* methods
+        meth = self._dispatch.get(op.name)
+        if meth is not None:
+            return meth(op, mem)
+
         if op.name in self.UNARY_OPS:
             if len(op.args) != 1 and op.name not in self.BINARY_OPS:
                 raise RuntimeError(
@@ -209,11 +284,28 @@ class Interpreter(object):
         if op.name == '[]':
             return self.execute_ArrayIndex(op, mem)
 
-        meth = getattr(self, 'execute_%s' % (op.name,))
-        return meth(op, mem)
+        raise AttributeError("Unknown operation: '%s'" % (op.name,))
+
+    def execute_Const(self, c, mem):
+        # Constant is parsed only once and the value is remembered on the node
+        # (together with the string it was parsed from, since a parser may
+        # still rewrite it). Parsing the constant's text is language
+        # specific: each interpreter defines 'parse_const(self, c)'.
+        cached = getattr(c, 'cached', None)
+        if cached is not None and cached[0] is c.value:
+            return cached[1]
+
+        val = self.parse_const(c)
+        c.cached = (c.value, val)
+        return val
 
     def execute_Var(self, v, mem):
-        return mem.get(v.tostr(), UndefValue())
+        # Name in memory is remembered on the node (expressions do not change
+        # during execution)
+        key = getattr(v, 'memkey', None)
+        if key is None:
+            key = v.memkey = v.tostr()
+        return mem.get(key, UndefValue())
 
     def execute_ListHead(self, l, mem):
 
@@ -238,7 +330,7 @@ class Interpreter(object):
         is_output = self.is_output(a)
 
         if len(a.args) > 1 and is_output:
-            values = self.filter_with_regex(a.args[1:], mem)
+            values = self.filter_with_regex(islice(a.args, 1, None), mem)
             val = ''.join(values)
 
             if self.track:
@@ -246,20 +338,23 @@ class Interpreter(object):
 
             return val
 
+        if len(a.args) == 1:
+            return self.unescape_chars(str(self.execute(a.args[0], mem)))
+
         return ''.join([self.unescape_chars(str(self.execute(x, mem))) for x in a.args])
 
     def is_output(self, a):
-        in_var_args = [x for x in a.args if isinstance(x, Var) and x.name == VAR_OUT]
+        # Expressions do not change during execution, so the result is
+        # remembered on the node itself
+        res = getattr(a, 'isoutput', None)
+        if res is not None:
+            return res
 
-        if in_var_args:
-            return True
+        res = any(isinstance(x, Var) and x.name == VAR_OUT for x in a.args) \
+            or any(isinstance(x, Op) and self.is_output(x) for x in a.args)
 
-        in_op_args = [x for x in a.args if isinstance(x, Op) and self.is_output(x)]
-
-        if in_op_args:
-            return True
-
-        return False
+        a.isoutput = res
+        return res
 
     def filter_with_regex(self, args, mem):
         values = []
@@ -267,7 +362,7 @@ class Interpreter(object):
         for x in args:
             s = self.unescape_chars(str(self.execute(x, mem)))
 
-            lst = re.findall(self.filter_regex, s)
+            lst = self.filter_re.findall(s)
 
             if not lst:
                 continue
@@ -277,50 +372,16 @@ class Interpreter(object):
         return values
 
     def unescape_chars(self, s):
-        res = ''
-
-        i = 0
-        while i < len(s):
-            if s[i] == '\\' and i + 1 < len(s):
-                if s[i+1] == 't':
-                    res += '\t'
-                    i += 2
-                elif s[i+1] == 'b':
-                    res += '\b'
-                    i += 2
-                elif s[i+1] == 'n':
-                    res += '\n'
-                    i += 2
-                elif s[i+1] == 'r':
-                    res += '\r'
-                    i += 2
-                elif s[i+1] == '\'':
-                    res += '\''
-                    i += 2
-                elif s[i+1] == '\"':
-                    res += '\"'
-                    i += 2
-                elif s[i+1] == '\\':
-                    res += '\\'
-                    i += 2
-                else:
-                    res += '\\'
-                    i += 1
-
-            else:
-                res += s[i]
-                i += 1
-
-        return res
+        return UNESCAPE_RE.sub(lambda m: UNESCAPE_CHARS[m.group(1)], s)
 
     def execute_StrFormat(self, f, mem):
         fmt = self.execute(f.args[0], mem)
         if not isinstance(fmt, str):
             raise RuntimeErr("Expected 'str' for format, got '%s'" % (fmt,))
 
-        args = [self.execute(x, mem) for x in f.args[1:]]
+        args = tuple(self.execute(x, mem) for x in islice(f.args, 1, None))
 
-        return fmt % tuple(args)
+        return fmt % args
 
     def execute_ite(self, ite, mem):
         cond = not not self.execute(ite.args[0], mem)
@@ -337,7 +398,7 @@ class Interpreter(object):
         except KeyError:
             raise RuntimeErr("Unknown function: '%s'" % (name,))
 
-        args = [self.execute(x, mem) for x in f.args[1:]]
+        args = [self.execute(x, mem) for x in islice(f.args, 1, None)]
 
         newmem = {
             VAR_IN: mem.get(VAR_IN, UndefValue()),
@@ -357,7 +418,7 @@ class Interpreter(object):
         self.fnc = oldfnc
         self.loc = oldloc
 
-        return trace[-1][2].get(prime(VAR_RET), self.DEFAULT_RETURN)
+        return trace[-1][2].get(VAR_RET_PRIMED, self.DEFAULT_RETURN)
 
 
 INTERPRETERS = {}
@@ -4,11 +4,14 @@ JAVA interpreter
 
 # clara lib imports
 from .interpreter import Interpreter, addlanginter, RuntimeErr, UndefValue
-from .model import Var, VAR_IN
+from .model import Var, Op, VAR_IN
 
 import math
+import operator
 import re
 
+from functools import lru_cache
+
 
 def libcall(*args):
     '''
@@ -42,6 +45,47 @@ def libcall(*args):
     return dec
 
 
+@lru_cache(maxsize=256)
+def compile_regex(r):
+    return re.compile(r)
+
+
+# Implementations of binary operators (except short-circuit '&&' and '||')
+BINARY_FNCS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': operator.truediv, '%': operator.mod,
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+    '^': operator.xor, '&': operator.and_, '|': operator.or_,
+    '<<': operator.lshift, '>>': operator.rshift,
+}
+
+# Implementations of unary operators (except '!')
+UNARY_FNCS = {'-': operator.neg, '+': operator.pos}
+
+
+# Conversions to basic types (int() and float() already map bools to 1/0)
+def convert_int(val):
+    if isinstance(val, str):
+        return ord(val)
+    return int(val)
+
+
+def convert_char(val):
+    if isinstance(val, int):
+        return chr(val)
+    if not isinstance(val, str) or len(val) > 2:
+        raise RuntimeErr("Expected char, got '%s'" % (val,))
+
+    if val == '\\\\':
+        val = '\\'
+
+    return val[0]
+
+
+CONVERTERS = {'int': convert_int, 'float': float, 'char': convert_char}
+
+
 class JavaInterpreter(Interpreter):
     BINARY_OPS = {'+', '-', '*', '/', '%', '<', '<=', '>', '>=', '==', '!=',
                   '^', '&', '!', '&&', '||', '<<', '>>'}
@@ -50,7 +94,10 @@ class JavaInterpreter(Interpreter):
 
     UNARY_OPS = {'!', '-', '+'}
 
-    def execute_Const(self, c, mem):
+    # Ops that always return a newly built array
+    FRESH_ARRAY_OPS = {'ArrayCreate', 'ArrayInit', 'ArrayAssign'}
+
+    def parse_const(self, c):
         if c.value == 'null':
             return None
 
@@ -88,16 +135,15 @@ class JavaInterpreter(Interpreter):
 
         x = self.tonumeric(self.execute(x, mem))
 
-        if op == '-':
-            res = -x
-        elif op == '+':
-            res = +x
-        elif op == '!':
-            res = not x
-        else:
-            assert False, "Unknown unary op: '%s'" % (op,)
+        # Negation gives 1/0 (as other logical ops), while '-' and '+' keep
+        # the numeric type
+        if op == '!':
+            return 0 if x else 1
+
+        fnc = UNARY_FNCS.get(op)
+        assert fnc is not None, "Unknown unary op: '%s'" % (op,)
 
-        return self.tonumeric(res)
+        return fnc(x)
 
     def execute_BinaryOp(self, op, x, y, mem):
         t = None
@@ -122,53 +168,25 @@ class JavaInterpreter(Interpreter):
             return self.tonumeric(self.execute(y, mem))
 
         y = self.execute(y, mem)
-        if y and not isinstance(y, list) and not isinstance(y, str):
-            y = self.tonumeric(y)
-
-        x, y = self.togreater(x, y)
-
-        if isinstance(x, str) and (isinstance(y, int) or isinstance(y, float)):
-            if len(x) == 1:
-                x = ord(x)
-
-        if isinstance(y, str) and (isinstance(x, int) or isinstance(x, float)):
-            if len(y) == 1:
-                y = ord(y)
-
-        if op == '+':
-            res = x + y
-        elif op == '-':
-            res = x - y
-        elif op == '*':
-            res = x * y
-        elif op == '/':
-            res = x / y
-        elif op == '%':
-            res = x % y
-        elif op == '==':
-            res = x == y
-        elif op == '!=':
-            res = x != y
-        elif op == '<':
-            res = x < y
-        elif op == '<=':
-            res = x <= y
-        elif op == '>':
-            res = x > y
-        elif op == '>=':
-            res = x >= y
-        elif op == '^':
-            res = x ^ y
-        elif op == '&':
-            res = x & y
-        elif op == '|':
-            res = x | y
-        elif op == '<<':
-            res = x << y
-        elif op == '>>':
-            res = x >> y
-        else:
-            assert False, 'Unknown binary op: %s' % (op,)
+
+        # Two ints (the common case) need no conversion
+        if not (type(x) is int and type(y) is int):
+            if y and not isinstance(y, list) and not isinstance(y, str):
+                y = self.tonumeric(y)
+
+            x, y = self.togreater(x, y)
+
+            if isinstance(x, str) and (isinstance(y, int) or isinstance(y, float)):
+                if len(x) == 1:
+                    x = ord(x)
+
+            if isinstance(y, str) and (isinstance(x, int) or isinstance(x, float)):
+                if len(y) == 1:
+                    y = ord(y)
+
+        fnc = BINARY_FNCS.get(op)
+        assert fnc is not None, 'Unknown binary op: %s' % (op,)
+        res = fnc(x, y)
 
         if isinstance(x, int) and op not in self.BINARY_BOOL_OPS:
             if t and t != 'int':
@@ -192,7 +210,7 @@ class JavaInterpreter(Interpreter):
 
     def execute_ArrayCreate(self, ac, mem):
         x = int(self.tonumeric(self.execute(ac.args[0], mem)))
-        return [None for _ in range(x)]
+        return [None] * x
 
     def execute_ArrayInit(self, ai, mem):
         return [self.execute(x, mem) for x in ai.args]
@@ -201,7 +219,12 @@ class JavaInterpreter(Interpreter):
         a = self.execute(aa.args[0], mem)
         if not isinstance(a, list):
             raise RuntimeErr("Expected 'list', got '%s'" % (a,))
-        a = list(a)
+
+        # Values in memory are shared with the trace (see 'procmem'), so
+        # copy the array, unless it was just built by the array expression
+        arr = aa.args[0]
+        if not (isinstance(arr, Op) and arr.name in self.FRESH_ARRAY_OPS):
+            a = list(a)
 
         i = int(self.tonumeric(self.execute(aa.args[1], mem)))
         if i < 0 or i >= len(a):
@@ -225,17 +248,12 @@ class JavaInterpreter(Interpreter):
         return a[i]
 
     def execute_hasNext(self, op, mem):
-        if mem[VAR_IN] and isinstance(mem[VAR_IN], list) and len(mem[VAR_IN]) > 0:
-            return True
-        else:
-            return False
+        ins = mem[VAR_IN]
+        return type(ins) is list and len(ins) > 0
 
     def execute_hasNextInt(self, op, mem):
-        if mem[VAR_IN] and isinstance(mem[VAR_IN], list) and len(mem[VAR_IN]) > 0:
-            if isinstance(mem[VAR_IN][0], int):
-                return True
-        else:
-            return False
+        ins = mem[VAR_IN]
+        return type(ins) is list and len(ins) > 0 and isinstance(ins[0], int)
 
     def execute_length(self, op, mem):
         v = self.execute(op.args[0], mem)
@@ -252,15 +270,17 @@ class JavaInterpreter(Interpreter):
         return v[i:]
 
     def execute_matches(self, op, mem):
-        s = self.execute(op.args[0], mem)
-        r = self.execute(op.args[1], mem)
-        regex = re.compile(r)
+        s, r = op.args
+        s = self.execute(s, mem)
+        r = self.execute(r, mem)
+        regex = compile_regex(r)
 
         return regex.match(s) is not None
 
     def execute_concat(self, op, mem):
-        a = self.execute(op.args[0], mem)
-        b = self.execute(op.args[1], mem)
+        a, b = op.args
+        a = self.execute(a, mem)
+        b = self.execute(b, mem)
 
         return a + b
 
@@ -277,8 +297,9 @@ class JavaInterpreter(Interpreter):
         return int(v)
 
     def execute_sum(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
+        u, v = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
 
         return u + v
 
@@ -287,13 +308,15 @@ class JavaInterpreter(Interpreter):
         return str(v)
 
     def execute_charAt(self, op, mem):
-        v = self.execute(op.args[0], mem)
-        i = self.execute(op.args[1], mem)
+        v, i = op.args
+        v = self.execute(v, mem)
+        i = self.execute(i, mem)
         return v[i]
 
     def execute_equals(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
+        u, v = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
 
         return u == v
 
@@ -309,29 +332,33 @@ class JavaInterpreter(Interpreter):
         return u.startswith(v)
 
     def execute_endsWith(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
+        u, v = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
 
         return u.endswith(v)
 
     def execute_replace(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
-        w = self.execute(op.args[2], mem)
+        u, v, w = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
+        w = self.execute(w, mem)
 
         return u.replace(v, w)
 
     def execute_replaceAll(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
-        w = self.execute(op.args[2], mem)
+        u, v, w = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
+        w = self.execute(w, mem)
 
         return u.replace(v, w)
 
     def execute_replaceFirst(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
-        w = self.execute(op.args[2], mem)
+        u, v, w = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
+        w = self.execute(w, mem)
 
         return u.replace(v, w, 1)
 
@@ -345,8 +372,9 @@ class JavaInterpreter(Interpreter):
             return -1
 
     def execute_contains(self, op, mem):
-        u = self.execute(op.args[0], mem)
-        v = self.execute(op.args[1], mem)
+        u, v = op.args
+        u = self.execute(u, mem)
+        v = self.execute(v, mem)
 
         return v in u
 
@@ -373,21 +401,24 @@ class JavaInterpreter(Interpreter):
         return '[' + ', '.join(str(a) for a in arr) + ']'
 
     def execute_Arraysequals(self, op, mem):
-        arr1 = self.execute(op.args[0], mem)
-        arr2 = self.execute(op.args[1], mem)
+        arr1, arr2 = op.args
+        arr1 = self.execute(arr1, mem)
+        arr2 = self.execute(arr2, mem)
 
         return arr1 == arr2
 
     def execute_copyOfRange(self, op, mem):
-        arr = self.execute(op.args[0], mem)
-        start = self.execute(op.args[1], mem)
-        end = self.execute(op.args[2], mem)
+        arr, start, end = op.args
+        arr = self.execute(arr, mem)
+        start = self.execute(start, mem)
+        end = self.execute(end, mem)
 
         return arr[start:end]
 
     def execute_copyOf(self, op, mem):
-        arr = self.execute(op.args[0], mem)
-        length = self.execute(op.args[1], mem)
+        arr, length = op.args
+        arr = self.execute(arr, mem)
+        length = self.execute(length, mem)
 
         if len(arr) < length:
             return arr + (length - len(arr)) * [0]
@@ -395,12 +426,15 @@ class JavaInterpreter(Interpreter):
             return arr[:length]
 
     def execute_clone(self, op, mem):
-        return self.execute(op.args[0], mem)
+        # Clone is an independent array
+        arr = self.execute(op.args[0], mem)
+        return arr.copy() if isinstance(arr, list) else arr
 
     def execute_sort(self, op, mem):
         arr = self.execute(op.args[0], mem)
 
-        return arr.sort()
+        # Arrays are shared with the trace (see 'procmem'), so sort a copy
+        return sorted(arr)
 
     @libcall('float')
     def execute_floor(self, x):
@@ -438,8 +472,9 @@ class JavaInterpreter(Interpreter):
         return min(x, y)
 
     def execute_floorDiv(self, op, mem):
-        x = self.execute(op.args[0], mem)
-        y = self.execute(op.args[1], mem)
+        x, y = op.args
+        x = self.execute(x, mem)
+        y = self.execute(y, mem)
         return x // y
 
     def execute_signum(self, op, mem):
@@ -451,7 +486,12 @@ class JavaInterpreter(Interpreter):
             return 1
 
     def tonumeric(self, v):
-        if v in [True, False]:
+        # Exact type checks first (the common case)
+        t = type(v)
+        if t is int or t is float:
+            return v
+
+        if t is bool:
             return 1 if v else 0
 
         if not isinstance(v, (int, float)):
@@ -460,6 +500,10 @@ class JavaInterpreter(Interpreter):
         return v
 
     def togreater(self, x, y):
+        # Nothing to promote when types are the same (the common case)
+        if type(x) is type(y):
+            return x, y
+
         if isinstance(x, float):
             return x, float(y)
 
@@ -469,40 +513,26 @@ class JavaInterpreter(Interpreter):
         return x, y
 
     def convert(self, val, t):
-        if isinstance(val, UndefValue):
+        if val is None or isinstance(val, UndefValue):
             return val
 
-        if val is None:
-            return None
-
-        if t == 'int':
-            if val in [True, False]:
-                val = 1 if val else 0
-            elif isinstance(val, str):
-                return ord(val)
-            return int(val)
-
-        if t == 'float':
-            if val in [True, False]:
-                val = 1.0 if val else 0.0
-            return float(val)
-
-        if t == 'char':
-            if isinstance(val, int):
-                return chr(val)
-            if not isinstance(val, str) or len(val) > 2:
-                raise RuntimeErr("Expected char, got '%s'" % (val,))
-
-            if val == '\\\\':
-                val = '\\'
-
-            return val[0]
+        fnc = CONVERTERS.get(t)
+        if fnc is not None:
+            return fnc(val)
 
         if t.endswith('[]'):
-            st = t[:-2]
-            if isinstance(val, list):
-                return [x if x is None else self.convert(x, st) for x in val]
-            raise RuntimeErr("Expected list, got '%s'" % (val,))
+            if not isinstance(val, list):
+                raise RuntimeErr("Expected list, got '%s'" % (val,))
+
+            fnc = CONVERTERS.get(t[:-2])
+            if fnc is not None:
+                try:
+                    return list(map(fnc, val))
+                except (TypeError, RuntimeErr):
+                    # Some elements are unset (None) or undefined
+                    return [x if x is None or isinstance(x, UndefValue) else fnc(x)
+                            for x in val]
+            return [x if x is None else self.convert(x, t[:-2]) for x in val]
 
         return val
 
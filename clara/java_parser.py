@@ -6,7 +6,71 @@ JAVA parser
 from .model import Var, Const, Op, VAR_OUT, VAR_RET, VAR_IN
 from .parser import Parser, addlangparser, NotSupported, ParseError
 
+import hashlib
 import javalang
+import os
+import pickle
+import sys
+import tempfile
+
+from collections import defaultdict
+from functools import lru_cache
+
+
+# Environment variable naming a directory for parsed ASTs (kept between
+# runs, disabled when not set). Cached trees are unpickled, which can run
+# arbitrary code, so the directory must be trusted (writable only by the
+# user running clara). Nothing is ever removed from it.
+CACHE_ENV = 'CLARA_JAVA_CACHE'
+
+
+def cache_path(cachedir, code):
+    # javalang version is part of the key, so a different parser version
+    # never loads old trees
+    key = '%s\0%s' % (javalang.__version__, code)
+    h = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(cachedir, h + '.pkl')
+
+
+@lru_cache(maxsize=256)
+def parse_java(code):
+    # Visitors only read the AST, so the same tree can be reused when the
+    # same code is parsed again
+    cachedir = os.environ.get(CACHE_ENV)
+    if not cachedir:
+        return javalang.parse.parse(code)
+
+    # Any failure to load an entry (missing, truncated, or pickled by an
+    # incompatible javalang) is a cache miss
+    path = cache_path(cachedir, code)
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+
+    ast = javalang.parse.parse(code)
+
+    # Write to a temporary file first, so that concurrent runs never see
+    # a partial tree; any failure only means the tree is not cached
+    tmp = None
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(ast, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        tmp = None
+    except Exception:
+        pass
+    finally:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    return ast
 
 
 class JavaParser(Parser):
@@ -26,6 +90,11 @@ class JavaParser(Parser):
 
     ARR_FNCS = {'clone'}
 
+    # Ops that give a declaration an array type
+    ARRAY_INIT_OPS = {'ArrayCreate', 'ArrayInit'}
+
+    INCDEC_OPS = {'++', '--'}
+
     NOTOP = '!'
     OROP = '||'
     ANDOP = '&&'
@@ -37,9 +106,11 @@ class JavaParser(Parser):
 
         self.inswitch = False
 
-        self.fnc_names = []
+        self.postincdec = 0
+
+        self.fnc_names = set()
 
-        self.calling_fncs = {}  # fnc name -> [calling fnc names] (needed if method is called before declaration)
+        self.calling_fncs = defaultdict(set)  # fnc name -> {calling fnc names} (needed if method is called before declaration)
 
     def parse(self, code):
         """
@@ -47,7 +118,7 @@ class JavaParser(Parser):
         """
 
         try:
-            ast = javalang.parse.parse(code)
+            ast = parse_java(code)
         except javalang.parser.JavaSyntaxError as e:
             print(e.description)
             raise ParseError(e.description)
@@ -59,36 +130,25 @@ class JavaParser(Parser):
             self.visit(t)
 
     def visit_ClassDeclaration(self, node):
-        self.fnc_names = [e.name for e in node.body if e.__class__.__name__ == 'MethodDeclaration']
-        for fnc in self.fnc_names:
-            self.calling_fncs[fnc] = []
+        self.fnc_names = {e.name for e in node.body
+                          if isinstance(e, javalang.parser.tree.MethodDeclaration)}
 
         for e in node.body:
             self.visit(e)
 
     def visit_ClassCreator(self, node):
         type = self.visit(node.type)
-        exprs = []
-
-        for decl in node.arguments:
-            expr = self.visit_expr(decl)
-            exprs.append(expr)
-
-        return Op('ClassCreate', *exprs, type=type)
+        return Op('ClassCreate', *map(self.visit_expr, node.arguments),
+                  type=type)
 
     def visit_MethodDeclaration(self, node):
         name = node.name
         rtype = self.visit(node.return_type) if node.return_type else 'void'
 
-        params = []
-
-        for p in node.parameters:
-            param_name, param_type = self.visit(p)
-
-            params.append((param_name, param_type))
+        params = [self.visit(p) for p in node.parameters]
 
         self.addfnc(name, params, rtype)
-        self.fnc.add_calling_fncs(self.calling_fncs[name])
+        self.fnc.add_calling_fncs(sorted(self.calling_fncs[name]))
 
         for v, t in params:
             self.addtype(v, t)
@@ -113,7 +173,7 @@ class JavaParser(Parser):
         for decl in node.declarators:
             name, init = self.visit(decl)
 
-            if isinstance(init, Op) and (init.name == 'ArrayCreate' or init.name == 'ArrayInit'):
+            if isinstance(init, Op) and init.name in self.ARRAY_INIT_OPS:
                 type += '[]'
 
             try:
@@ -126,27 +186,18 @@ class JavaParser(Parser):
             self.addexpr(name, init)
 
     def visit_VariableDeclaration(self, node):
-        type = self.visit(node.type)
-
-        for decl in node.declarators:
-            name, init = self.visit(decl)
+        self.declare(node, local=False)
 
-            if isinstance(init, Var):
-                init.type = type
-
-            if isinstance(init, Op) and (init.name == 'ArrayCreate' or init.name == 'ArrayInit'):
-                type += '[]'
-
-            try:
-                self.addtype(name, type)
-            except AssertionError:
-                self.addwarn("Ignored global definition '%s' on line %s." % (
-                    name, node.position,))
-                return
+    def visit_LocalVariableDeclaration(self, node):
+        self.declare(node, local=True)
 
-            self.addexpr(name, init)
+    def declare(self, node, local):
+        '''
+        Variable declaration: for a local declaration reading from input also
+        consumes the input, otherwise an array initializer makes the type an
+        array type
+        '''
 
-    def visit_LocalVariableDeclaration(self, node):
         type = self.visit(node.type)
         varin = False
 
@@ -157,8 +208,11 @@ class JavaParser(Parser):
                 init.type = type
 
             if isinstance(init, Op):
-                if init.name == 'ListHead':
-                    varin = True
+                if local:
+                    if init.name == 'ListHead':
+                        varin = True
+                elif init.name in self.ARRAY_INIT_OPS:
+                    type += '[]'
 
             try:
                 self.addtype(name, type)
@@ -184,8 +238,7 @@ class JavaParser(Parser):
         return self.visit(node.type)
 
     def visit_ArrayInitializer(self, node):
-        exprs = list(map(self.visit_expr, node.initializers or []))
-        return Op('ArrayInit', *exprs)
+        return Op('ArrayInit', *map(self.visit_expr, node.initializers or ()))
 
     def visit_ArrayCreator(self, node):
         if len(node.dimensions) > 1:
@@ -203,6 +256,10 @@ class JavaParser(Parser):
             for statement in node.statements:
                 res = self.visit(statement)
 
+                # Most statements return nothing
+                if res is None:
+                    continue
+
                 if isinstance(res, Op) and res.name == 'MethodInvocation':
                     self.addexpr('_', res)
 
@@ -210,82 +267,101 @@ class JavaParser(Parser):
         return self.visit(node.expression)
 
     def visit_MethodInvocation(self, node):
+        line = node.position.line
+        member = sys.intern(node.member)
+
         op = None
-        # Parse args
-        args = list(map(self.visit_expr, node.arguments))
+        # Parse args (and count x++/x-- in them)
+        outer = self.postincdec
+        self.postincdec = 0
+        args = tuple(map(self.visit_expr, node.arguments))
+
+        # Increments in these args also belong to the enclosing call
+        postincdec = self.postincdec
+        self.postincdec = outer + postincdec
 
         if node.qualifier is None:
-            return Op(node.member, *args, line=node.position.line)
+            return Op(member, *args, line=line)
 
         if node.qualifier.startswith('System'):
-            if node.member == 'println' or node.member == 'print':
-                self.visit_println(node, args)
+            if member == 'println' or member == 'print':
+                self.visit_println(node, args, postincdec)
 
-            elif node.member == 'printf':
-                self.visit_printf(node, args)
+            elif member == 'printf':
+                self.visit_printf(node, args, postincdec)
 
-            elif node.member == 'exit':
-                op = Op(node.member, *args, line=node.position.line)
+            elif member == 'exit':
+                op = Op(member, *args, line=line)
 
-        elif node.qualifier == 'Math' and node.member in self.MATH_FNCS:
-            op = Op(node.member, *args, line=node.position.line)
+        elif node.qualifier == 'Math' and member in self.MATH_FNCS:
+            op = Op(member, *args, line=line)
 
-        elif node.qualifier in self.STATIC_FNCS.keys() and \
-                node.member in self.STATIC_FNCS.get(node.qualifier):
+        elif node.qualifier in self.STATIC_FNCS and \
+                member in self.STATIC_FNCS[node.qualifier]:
             if node.qualifier == 'Integer':
-                if node.member == 'toString':
-                    op = Op('IntegertoString', *args, line=node.position.line)
-                elif node.member == 'valueOf':
-                    op = Op('IntegervalueOf', *args, line=node.position.line)
+                if member == 'toString':
+                    op = Op('IntegertoString', *args, line=line)
+                elif member == 'valueOf':
+                    op = Op('IntegervalueOf', *args, line=line)
             elif node.qualifier == 'Arrays':
-                if node.member == 'toString':
-                    op = Op('ArraystoString', *args, line=node.position.line)
-                elif node.member == 'equals':
-                    op = Op('Arraysequals', *args, line=node.position.line)
+                if member == 'toString':
+                    op = Op('ArraystoString', *args, line=line)
+                elif member == 'equals':
+                    op = Op('Arraysequals', *args, line=line)
+                elif member == 'sort':
+                    # Sorting is in place, so it becomes an assignment of the
+                    # sorted array
+                    if len(args) != 1 or not isinstance(args[0], Var):
+                        raise NotSupported(
+                            'Arrays.sort supported only for a single array variable',
+                            line=line)
+                    self.addexpr(args[0].name,
+                                 Op('sort', args[0].copy(), line=line))
+                    return
 
             if op is None:
-                op = Op(node.member, *args, line=node.position.line)
+                op = Op(member, *args, line=line)
 
-        elif node.member in self.fnc_names:
-            expr = Var(node.member, line=node.position.line)
+        elif member in self.fnc_names:
+            expr = Var(member, line=line)
 
-            called_fnc = self.fncs.get(node.member, None)
+            called_fnc = self.fncs.get(member, None)
             if called_fnc and self.fnc:
                 called_fnc.add_calling_fncs([self.fnc.name])
             elif not called_fnc and self.fnc:
-                if self.fnc.name not in self.calling_fncs[node.member]:
-                    self.calling_fncs[node.member].append(self.fnc.name)
+                self.calling_fncs[member].add(self.fnc.name)
 
-            op = Op('FuncCall', expr, *args, line=node.position.line)
+            op = Op('FuncCall', expr, *args, line=line)
 
-        elif self.fnc.gettype(node.qualifier) == 'String' and \
-                node.member in self.STRING_FNCS:
-            expr = Var(node.qualifier, line=node.position.line)
-            op = Op(node.member, expr, *args, line=node.position.line)
+        else:
+            # Remaining calls are methods on a variable, depending on its type
+            qtype = self.fnc.gettype(node.qualifier)
 
-        elif self.fnc.gettype(node.qualifier) == 'Scanner' and \
-                node.member in self.SCANNER_FNCS:
-            if node.member.startswith('next'):
-                t = node.member.split('next')[1].lower()
+            if qtype == 'String' and member in self.STRING_FNCS:
+                expr = Var(node.qualifier, line=line)
+                op = Op(member, expr, *args, line=line)
 
-                if t == '' or t == 'line':
-                    t = '*'
+            elif qtype == 'Scanner' and member in self.SCANNER_FNCS:
+                if member.startswith('next'):
+                    t = member.split('next')[1].lower()
 
-                rexpr = Op('ListHead', Const(t), Var(VAR_IN), line=node.position.line)
+                    if t == '' or t == 'line':
+                        t = '*'
 
-                op = rexpr
-            else:
-                op = Op(node.member, *args, line=node.position.line)
+                    rexpr = Op('ListHead', Const(t), Var(VAR_IN), line=line)
 
-        elif isinstance(self.fnc.gettype(node.qualifier), str) and \
-                self.fnc.gettype(node.qualifier).endswith('[]') and \
-                node.member in self.ARR_FNCS:
-            expr = Var(node.qualifier, line=node.position.line)
-            op = Op(node.member, expr, *args, line=node.position.line)
+                    op = rexpr
+                else:
+                    op = Op(member, *args, line=line)
 
-        else:
-            raise NotSupported(
-                "Unsupported function call: '%s'" % (node.member,), line=node.position.line)
+            elif isinstance(qtype, str) and qtype.endswith('[]') and \
+                    member in self.ARR_FNCS:
+                expr = Var(node.qualifier, line=line)
+                op = Op(member, expr, *args, line=line)
+
+            else:
+                raise NotSupported(
+                    "Unsupported function call: '%s'" % (member,), line=line)
 
         if node.selectors:
             ret_expr = self.visit(node.selectors[0])
@@ -295,98 +371,119 @@ class JavaParser(Parser):
         if op:
             return op
 
-    def visit_println(self, node, args):
-        values_model = list(map(self.visit_expr, node.arguments))
-        expr = Op('StrAppend', Var(VAR_OUT), *values_model, line=node.position.line)
-        self.addexpr(VAR_OUT, expr)
+    def visit_println(self, node, args, postincdec=0):
+        # Arguments are already visited (by visit_MethodInvocation), printing
+        # goes before their x++/x-- (if any)
+        expr = Op('StrAppend', Var(VAR_OUT), *args, line=node.position.line)
+        self.addexpr(VAR_OUT, expr,
+                     idx=-postincdec if postincdec else None)
 
-    def visit_printf(self, node, args):
+    def visit_printf(self, node, args, postincdec=0):
         '''
                 printf function call
                 '''
 
+        line = node.position.line
+
         # Extract format and args
         if len(args) == 0:
-            self.addwarn("'printf' with zero args at line %s" % (
-                node.position.line,))
-            fmt = Const('?', line=node.position.line)
+            self.addwarn("'printf' with zero args at line %s" % (line,))
+            fmt = Const('?', line=line)
         else:
             if isinstance(args[0], Const):
                 fmt = args[0]
                 args = args[1:]
             else:
                 self.addwarn("First argument of 'printf' at lines %s should \
-        be a format" % (node.position.line,))
-                fmt = Const('?', line=node.position.line)
+        be a format" % (line,))
+                fmt = Const('?', line=line)
 
-        fmt.value = fmt.value.replace('%lf', '%f')
-        fmt.value = fmt.value.replace('%ld', '%d')
-        fmt.value = fmt.value.replace('%lld', '%d')
+        # Length modifiers are rare, so most formats are left untouched
+        if '%l' in fmt.value:
+            fmt.value = fmt.value.replace('%lf', '%f')
+            fmt.value = fmt.value.replace('%ld', '%d')
+            fmt.value = fmt.value.replace('%lld', '%d')
 
         expr = Op('StrAppend', Var(VAR_OUT),
-                  Op('StrFormat', fmt, *args, line=node.position.line),
-                  line=node.position.line)
-        self.addexpr(VAR_OUT, expr)
+                  Op('StrFormat', fmt, *args, line=line),
+                  line=line)
+        self.addexpr(VAR_OUT, expr,
+                     idx=-postincdec if postincdec else None)
 
     def visit_Literal(self, node):
-        expr = Const('{}'.format(node.value), line=node.position.line)
+        line = node.position.line
+
+        # Literal texts come from user programs, so they are not interned
+        # (interned strings are never freed in a long-running process)
+        expr = Const(node.value, line=line)
 
         if node.prefix_operators:
-            if node.prefix_operators[0] in ['--', '++']:
+            if node.prefix_operators[0] in self.INCDEC_OPS:
                 raise NotSupported('++/-- only supported for Vars')
             elif node.prefix_operators[0] == '-':
-                return Op('-', expr, line=node.position.line)
+                return Op('-', expr, line=line)
             elif node.prefix_operators[0] == '!':
-                return Op('!', expr, line=node.position.line)
+                return Op('!', expr, line=line)
 
         if node.postfix_operators:
-            if node.prefix_operators[0] in ['--', '++']:
+            if node.postfix_operators[0] in self.INCDEC_OPS:
                 raise NotSupported('++/-- only supported for Vars')
 
         return expr
 
     def visit_MemberReference(self, node):
-        if node.qualifier == 'System' and node.member == 'in':
-            rexpr = Op('ListHead', Const('*'), Var(VAR_IN), line=node.position.line)
-            return rexpr
-        elif self.fnc.gettype(node.qualifier) and \
-                self.fnc.gettype(node.qualifier).endswith('[]') and \
-                node.member == 'length':
-            arg = Var(node.qualifier, line=node.position.line, type=self.fnc.gettype(node.qualifier))
-            rexpr = Op('length', arg, line=node.position.line)
+        line = node.position.line
+
+        member = node.member
+
+        if node.qualifier == 'System' and member == 'in':
+            rexpr = Op('ListHead', Const('*'), Var(VAR_IN), line=line)
             return rexpr
 
-        expr = Var(node.member, line=node.position.line, type=self.fnc.gettype(node.member))
+        # Only 'length' needs the qualifier's type
+        if member == 'length':
+            qtype = self.fnc.gettype(node.qualifier)
+            if qtype and qtype.endswith('[]'):
+                arg = Var(node.qualifier, line=line, type=qtype)
+                rexpr = Op('length', arg, line=line)
+                return rexpr
+
+        expr = Var(sys.intern(member), line=line,
+                   type=self.fnc.gettype(member))
 
         if node.selectors:
             if len(node.selectors) > 1:
-                raise NotSupported('Double Array', line=node.position.line)
+                raise NotSupported('Double Array', line=line)
 
-            expr = Op('[]', expr, self.visit_expr(node.selectors[0]), line=node.position.line)
+            expr = Op('[]', expr, self.visit_expr(node.selectors[0]), line=line)
 
         if node.prefix_operators:
-            if node.prefix_operators[0] in ['--', '++']:
+            preop = node.prefix_operators[0]
+
+            if preop in self.INCDEC_OPS:
                 if not isinstance(expr, Var):
                     raise NotSupported('++/-- supported only for Vars',
-                                       line=node.position.line)
+                                       line=line)
 
                 self.addexpr(expr.name,
-                             Op(node.prefix_operators[0][1], expr.copy(), Const('1'), line=node.position.line))
+                             Op(preop[1], expr.copy(), Const('1', line=line),
+                                line=line))
 
-            elif node.prefix_operators[0] == '-':
-                return Op('-', expr, line=node.position.line)
-
-            elif node.prefix_operators[0] == '!':
-                return Op('!', expr, line=node.position.line)
+            elif preop == '-' or preop == '!':
+                return Op(preop, expr, line=line)
 
         if node.postfix_operators:
-            if node.postfix_operators[0] in ['--', '++']:
+            postop = node.postfix_operators[0]
+
+            if postop in self.INCDEC_OPS:
                 if not isinstance(expr, Var):
                     raise NotSupported('++/-- supported only for Vars',
-                                       line=node.position.line)
+                                       line=line)
 
                 self.addexpr(expr.name,
-                             Op(node.postfix_operators[0][1], expr.copy(), Const('1'), line=node.position.line))
+                             Op(postop[1], expr.copy(), Const('1', line=line),
+                                line=line))
+                self.postincdec += 1
 
         return expr
 
@@ -405,14 +502,14 @@ class JavaParser(Parser):
             raise NotSupported("Assignment operator: '%s'" % (node.type,))
 
         # Distinguish lvalue (ID and Array)
-        if isinstance(exprl, Var):
+        t = type(exprl)
+        if t is Var:
             lval = exprl
 
-        elif (isinstance(exprl, Op) and exprl.name == '[]' and
-              isinstance(exprl.args[0], Var)):
-            rvalue = Op('ArrayAssign', exprl.args[0].copy(),
-                        exprl.args[1].copy(), rvalue)
-            lval = exprl.args[0]
+        elif t is Op and exprl.name == '[]' and type(exprl.args[0]) is Var:
+            arr, idx = exprl.args[:2]
+            rvalue = Op('ArrayAssign', arr.copy(), idx.copy(), rvalue)
+            lval = arr
 
         else:
             raise NotSupported("Assignment exprl '%s'" % (exprl,))
@@ -429,25 +526,41 @@ class JavaParser(Parser):
         return self.visit_expr(node.index)
 
     def visit_BinaryOperation(self, node):
+        # javalang does not set a position on binary operations
+        line = node.position.line if node.position else None
+
         if node.operator == '+':  # string concatenation
             l = self.visit_expr(node.operandl)
             r = self.visit_expr(node.operandr)
+            line = line or l.line or r.line
+
+            # Chain of concatenations becomes a single StrAppend (joined
+            # at once)
+            if isinstance(l, Op) and l.name == 'StrAppend':
+                return Op('StrAppend', *(l.args + [r]), line=line)
 
             if (isinstance(l, Const) and len(l.value) >= 2 and l.value[0] == l.value[-1] == '"') or \
                     (isinstance(l, Var) and self.fnc.gettype(l.name) == 'String') or \
                     (isinstance(l, Op) and l.name == 'StrAppend'):
-                return Op('StrAppend', l, r)
+                return Op('StrAppend', l, r, line=line)
 
             if (isinstance(r, Const) and len(r.value) >= 2 and r.value[0] == r.value[-1] == '"') or \
                     (isinstance(r, Var) and self.fnc.gettype(r.name) == 'String') or \
                     (isinstance(r, Op) and r.name == 'StrAppend'):
-                return Op('StrAppend', l, r)
+                return Op('StrAppend', l, r, line=line)
 
-        return Op(node.operator, self.visit_expr(node.operandl), self.visit_expr(node.operandr))
+        # Operator names are compared and looked up by the interpreter
+        return Op(sys.intern(node.operator), self.visit_expr(node.operandl),
+                  self.visit_expr(node.operandr), line=line)
 
     def visit_TernaryExpression(self, node):
         cond = self.visit_expr(node.condition)
 
+        # Branches with side-effects are converted to an if-statement (known
+        # before visiting them in most cases)
+        if self.haseffects(node.if_true) or self.haseffects(node.if_false):
+            return self.visit_if(node, node.condition, node.if_true, node.if_false)
+
         n = self.numexprs()
         ift = self.visit_expr(node.if_true)
         iff = self.visit_expr(node.if_false)
@@ -458,36 +571,55 @@ class JavaParser(Parser):
 
         return Op('ite', cond, ift, iff)
 
+    def haseffects(self, node):
+        '''
+        Checks (without visiting) if visiting an expression surely adds
+        expressions, i.e., if it contains an assignment, ++/-- or printing
+        '''
+
+        for _, n in node:
+            if isinstance(n, javalang.parser.tree.Assignment):
+                return True
+
+            if isinstance(n, javalang.parser.tree.MemberReference):
+                if n.prefix_operators and n.prefix_operators[0] in self.INCDEC_OPS:
+                    return True
+                if n.postfix_operators and n.postfix_operators[0] in self.INCDEC_OPS:
+                    return True
+
+            if isinstance(n, javalang.parser.tree.MethodInvocation) and \
+                    n.qualifier and n.qualifier.startswith('System') and \
+                    n.member in ('println', 'print', 'printf'):
+                return True
+
+        return False
+
     def visit_IfStatement(self, node):
         self.visit_if(node, node.condition, node.then_statement, node.else_statement)
 
     def visit_SwitchStatement(self, node):
+        # Build nested if-else statements, starting from the last case
         n = len(node.cases)
+        stmt = None
 
-        def convert(i):
-            if i >= n:
-                return
-
+        for i in range(n - 1, -1, -1):
             item = node.cases[i]
-            # Item statement
-            stmt = item.statements
 
+            # Default (last) case is the final else branch
             if i == (n - 1) and len(item.case) == 0:
-                return stmt
+                stmt = item.statements
+                continue
 
             expr = item.case[0]
 
             if isinstance(item, javalang.parser.tree.SwitchStatementCase):
-                next = convert(i + 1)
-
                 ifcond = javalang.parser.tree.BinaryOperation(operator='==', operandl=node.expression,
                                                               operandr=expr)
-                ifstmt = javalang.parser.tree.IfStatement(condition=ifcond, then_statement=stmt,
-                                                          else_statement=next)
-
-                return ifstmt
+                stmt = javalang.parser.tree.IfStatement(condition=ifcond, then_statement=item.statements,
+                                                        else_statement=stmt)
+            else:
+                stmt = None
 
-        stmt = convert(0)
         if stmt:
             insw = self.inswitch
             self.inswitch = True
@@ -535,7 +667,7 @@ class JavaParser(Parser):
         self.loc = self.addloc(
             desc="after 'continue' statement at line %s" % (
                 node.position.line,))
-        self.addtrans(preloc, True, lastloop[2] if lastloop[2] else lastloop[0])
+        self.addtrans(preloc, True, lastloop[2] or lastloop[0])
 
     def visit_BreakStatement(self, node):
         if self.inswitch or self.nobcs:
@@ -577,8 +709,16 @@ class JavaParser(Parser):
         return Op('cast', Const(to_type), expr)
 
     def visit_list(self, node):
+        # Statements in a block mostly share a few node classes, so each
+        # visitor is looked up once per class (None and unknown nodes go
+        # through visit)
+        meths = {}
         for child in node:
-            self.visit(child)
+            t = type(child)
+            meth = meths.get(t)
+            if meth is None:
+                meth = meths[t] = self.visitors.get(t.__name__, self.visit)
+            meth(child)
 
     def getline(self, node):
         if isinstance(node, list):
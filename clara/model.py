@@ -47,6 +47,9 @@ class Expr(object):
     An expression
     '''
 
+    # Many expressions are created, so they have no per-instance dict
+    __slots__ = ('line', 'statement', 'original', 'type')
+
     def __init__(self, line=None, statement=False, original=None, type=None):
         self.line = line
         self.statement = statement
@@ -79,6 +82,9 @@ class Var(Expr):
     Variable
     '''
 
+    __slots__ = ('name', 'primed',
+                 'memkey')  # set by the interpreter
+
     def __init__(self, name, primed=False, *args, **kwargs):
 
         super(Var, self).__init__(*args, **kwargs)
@@ -153,6 +159,9 @@ class Const(Expr):
     Constant
     '''
 
+    __slots__ = ('value',
+                 'cached')  # set by the interpreter
+
     def __init__(self, value, *args, **kwargs):
 
         super(Const, self).__init__(*args, **kwargs)
@@ -203,6 +212,9 @@ class Op(Expr):
     Operations
     '''
 
+    __slots__ = ('name', 'args',
+                 'isoutput')  # set by the interpreter
+
     def __init__(self, name, *args, **kwargs):
 
         super(Op, self).__init__(**kwargs)
@@ -57,6 +57,12 @@ class Parser(object):
         self.hasbcs = False
         self.nobcs = nobcs
 
+        # Dispatch table: node class name -> bound 'visit_<name>' method
+        self.visitors = {}
+        for name in dir(type(self)):
+            if name.startswith('visit_'):
+                self.visitors[name[len('visit_'):]] = getattr(self, name)
+
     def newcnt(self):
         self.cnt += 1
         return self.cnt
@@ -256,13 +262,11 @@ class Parser(object):
         if node is None:
             return
 
-        # Name of the node class
-        name = node.__class__.__name__
-
-        # Get method
-        meth = getattr(self, 'visit_%s' % (name,), None)
+        # Get method (by the name of the node class)
+        meth = self.visitors.get(type(node).__name__)
         if meth is None:
-            raise NotSupported("Unimplemented visitor: '%s'" % (name,))
+            raise NotSupported("Unimplemented visitor: '%s'" % (
+                type(node).__name__,))
 
         # Call visitor method
         return meth(node)
@@ -270,6 +274,10 @@ class Parser(object):
     def visit_expr(self, node, allowlist=False, allownone=False):
         res = self.visit(node)
 
+        # Most visits return a single expression, which needs no checks
+        if isinstance(res, Expr):
+            return res
+
         if isinstance(res, list) and allowlist:
             ok = True
             for r in res:
@@ -513,7 +521,7 @@ class Parser(object):
         return self.loops.pop()
 
     def lastloop(self):
-        return self.loops[-1] if len(self.loops) else None
+        return self.loops[-1] if self.loops else None
 
     def isfncname(self, name):
         return name in self.fncs
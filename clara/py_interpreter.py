@@ -6,7 +6,7 @@ Python interpreter
 import math
 import string
 
-from copy import deepcopy
+from copy import copy, deepcopy
 
 # Feedback lib imports
 from .py_parser import PyParser
@@ -38,7 +38,7 @@ class PyInterpreter(Interpreter):
     UNARY_OPS = set()
     DEFAULT_RETURN = None
 
-    def execute_Const(self, c, mem):
+    def parse_const(self, c):
 
         c = c.value
         
@@ -333,19 +333,19 @@ class PyInterpreter(Interpreter):
 
     @eargs
     def execute_AssignElement(self, l, i, v):
-        l = deepcopy(l)
+        l = copy(l)
         l[i] = v
         return l
 
     @eargs
     def execute_append(self, l, e):
-        l = deepcopy(l)
+        l = copy(l)
         l.append(e)
         return l
 
     @eargs
     def execute_sort(self, l, *a):
-        l = deepcopy(l)
+        l = copy(l)
         l.sort(*a)
         return l
 
@@ -362,19 +362,19 @@ class PyInterpreter(Interpreter):
 
     @eargs
     def execute_extend(self, l, i):
-        l = deepcopy(l)
+        l = copy(l)
         l.extend(i)
         return l
 
     @eargs
     def execute_remove(self, l, i):
-        l = deepcopy(l)
+        l = copy(l)
         l.remove(i)
         return l
 
     @eargs
     def execute_insert(self, l, i, v):
-        l = deepcopy(l)
+        l = copy(l)
         l.insert(i, v)
         return l
 
@@ -396,7 +396,7 @@ class PyInterpreter(Interpreter):
 
     @eargs
     def execute_pop(self, l, *a):
-        nl = deepcopy(l)
+        nl = copy(l)
         res = nl.pop(*a)
         return (nl, res)
 
@@ -406,7 +406,7 @@ class PyInterpreter(Interpreter):
 
     @eargs
     def execute_Delete(self, l, i):
-        nl = deepcopy(l)
+        nl = copy(l)
         del nl[i]
         return nl
 
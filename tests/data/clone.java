@@ -0,0 +1,10 @@
+import java.util.Arrays;
+
+public class Clone {
+    public static void main(String[] args) {
+        int[] a = {3, 1, 2};
+        int[] b = a.clone();
+        Arrays.sort(b);
+        System.out.println(Arrays.toString(a) + Arrays.toString(b));
+    }
+}
@@ -0,0 +1,9 @@
+int main(){
+  int i = 0;
+
+  while (1) {
+    i = i + 1;
+  }
+
+  return i;
+}
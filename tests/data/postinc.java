@@ -0,0 +1,6 @@
+public class PostInc {
+    public static void main(String[] args) {
+        int x = 1;
+        System.out.println(x++);
+    }
+}
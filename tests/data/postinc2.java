@@ -0,0 +1,6 @@
+public class PostInc2 {
+    public static void main(String[] args) {
+        int x = 1;
+        System.out.println(String.valueOf(x++));
+    }
+}
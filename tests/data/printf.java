@@ -0,0 +1,6 @@
+public class Printf {
+    public static void main(String[] args) {
+        double x = 1.0 / 2;
+        System.out.printf("%lf", x);
+    }
+}
@@ -0,0 +1,11 @@
+import java.util.Arrays;
+
+public class Sort {
+    public static void main(String[] args) {
+        int[] a = {3, 1, 2};
+        while (a[0] > a[1]) {
+            Arrays.sort(a);
+        }
+        System.out.println(Arrays.toString(a));
+    }
+}
@@ -0,0 +1,38 @@
+"""
+Filtering (checking programs against tests) regression tests
+"""
+
+from utils import get_full_data_filename, parse_file
+
+from clara.filtering import Filtering
+from clara.interpreter import getlanginter
+from clara.parser import getlangparser
+
+
+def test_filter_sequential_and_pooled(capsys):
+    parser = getlangparser("c")
+    inter = getlanginter("c")
+
+    progs = []
+    for f in ['p1.c', 'sym1.c', 'p2.c', 'sym2.c']:
+        m = parse_file(get_full_data_filename(f), parser)
+        m.name = f
+        progs.append(m)
+
+    # Only p1.c and p2.c print the sum of the first 4 triangular numbers
+    tests = [{'ins': [4], 'args': None, 'out': '20', 'ret': None}]
+
+    F = Filtering()
+
+    seq = F.filter(progs, inter, tests, entryfnc='main', poolsize=1,
+                   verbose=True)
+    seqout = capsys.readouterr().out
+
+    pooled = F.filter(progs, inter, tests, entryfnc='main', poolsize=2,
+                      verbose=True)
+    pooledout = capsys.readouterr().out
+
+    assert [m.name for m in seq] == ['p1.c', 'p2.c']
+    assert [m.name for m in pooled] == ['p1.c', 'p2.c']
+    assert seqout == pooledout
+    assert seqout.startswith('p1.c\n')
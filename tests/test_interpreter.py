@@ -0,0 +1,36 @@
+"""
+Interpreter (tracing and timeout) regression tests
+"""
+
+import pytest
+
+from utils import get_full_data_filename, parse_file
+
+from clara.interpreter import getlanginter, RuntimeErr
+from clara.parser import getlangparser
+
+
+def parse_c(fname):
+    return parse_file(get_full_data_filename(fname), getlangparser("c"))
+
+
+def test_fulltrace():
+    m = parse_c("p1.c")
+    inter = getlanginter("c")
+
+    full = inter(entryfnc="main", fulltrace=True).run(m, ins=[4])
+    last = inter(entryfnc="main", fulltrace=False).run(m, ins=[4])
+
+    # Without the full trace only the last state is kept
+    assert len(full) > 1
+    assert len(last) == 1
+    assert last[0][:2] == full[-1][:2]
+    assert last[0][2] == full[-1][2]
+
+
+def test_timeout():
+    m = parse_c("loop.c")
+    inter = getlanginter("c")(entryfnc="main", timeout=1)
+
+    with pytest.raises(RuntimeErr, match="Timeout"):
+        inter.run(m, ins=[])
@@ -0,0 +1,152 @@
+"""
+Some basic (regression) Java tests
+"""
+
+import os
+import pickle
+
+import pytest
+
+from utils import get_full_data_filename, parse_file
+
+from clara.interpreter import getlanginter
+from clara.java_parser import CACHE_ENV, cache_path, parse_java
+from clara.model import prime
+from clara.parser import getlangparser, NotSupported
+
+
+def run_java(fname, ins=None):
+    f = get_full_data_filename(fname)
+    parser = getlangparser("java")
+    inter = getlanginter("java")
+
+    m = parse_file(f, parser)
+    inter = inter(entryfnc="main", timeout=5)
+
+    trace = inter.run(m, ins=ins or [])
+    return inter, trace
+
+
+def test_sort_keeps_earlier_states():
+    inter, trace = run_java("sort.java")
+
+    assert inter.output == "[1, 2, 3]"
+
+    # Sorting must not change the array recorded before the sort
+    arrp = prime("a")
+    states = [mem[arrp] for _, _, mem in trace if arrp in mem]
+    assert states[0] == [3, 1, 2]
+    assert states[-1] == [1, 2, 3]
+
+
+def test_clone_is_a_copy():
+    inter, _ = run_java("clone.java")
+
+    assert inter.output == "[3, 1, 2][1, 2, 3]"
+
+
+def test_ast_cache(tmp_path, monkeypatch):
+    code = "public class A { public static void main(String[] a) { } }"
+    cachedir = str(tmp_path)
+    path = cache_path(cachedir, code)
+    monkeypatch.setenv(CACHE_ENV, cachedir)
+
+    # Miss: the source is parsed and the tree stored
+    parse_java.cache_clear()
+    ast = parse_java(code)
+    assert os.path.exists(path)
+    with open(path, 'rb') as f:
+        assert repr(pickle.load(f)) == repr(ast)
+
+    # Hit: the stored tree is returned without parsing
+    with open(path, 'wb') as f:
+        pickle.dump('cached', f)
+    parse_java.cache_clear()
+    assert parse_java(code) == 'cached'
+
+    # Corrupt entry: the source is parsed again and the entry replaced
+    with open(path, 'wb') as f:
+        f.write(b'not a pickle')
+    parse_java.cache_clear()
+    assert repr(parse_java(code)) == repr(ast)
+    with open(path, 'rb') as f:
+        assert repr(pickle.load(f)) == repr(ast)
+
+    # Entry of an incompatible javalang (unknown node class): also a miss
+    with open(path, 'wb') as f:
+        f.write(b'\x80\x03cjavalang.tree\nNoSuchNode\nq\x00.')
+    parse_java.cache_clear()
+    assert repr(parse_java(code)) == repr(ast)
+
+    # Failed write: the tree is still returned, and nothing is left behind
+    os.remove(path)
+
+    def fail(*args):
+        raise RecursionError
+
+    monkeypatch.setattr(pickle, 'dump', fail)
+    parse_java.cache_clear()
+    assert repr(parse_java(code)) == repr(ast)
+    assert os.listdir(cachedir) == []
+
+    parse_java.cache_clear()
+
+
+def test_printf_float_division():
+    # 1.0 is a float, so the division is not an integer division
+    inter, _ = run_java("printf.java")
+
+    assert inter.output == "0.500000"
+
+
+def test_println_postinc():
+    # x++ is evaluated (and incremented) once, after its value is printed
+    inter, trace = run_java("postinc.java")
+
+    assert inter.output == "1"
+    assert trace[-1][2][prime("x")] == 2
+
+
+def test_no_class_not_rejected():
+    parser = getlangparser("java")
+
+    # Valid Java without a class is parsed, unsupported declarations are
+    # still reported as such
+    m = parser.parse_code("import java.util.Scanner;\n")
+    assert m.getfncnames() == []
+
+    with pytest.raises(NotSupported):
+        parser.parse_code("interface I {\n    int f();\n}\n")
+
+    m = parser.parse_code("""
+class $Foo {
+    public static void main(String[] args) {
+        System.out.println("ok");
+    }
+}
+""")
+    assert m.getfncnames() == ["main"]
+
+
+def test_class_after_comments_and_annotations():
+    code = """
+// A comment before the class
+/* and a block comment */
+@SuppressWarnings("unchecked")
+public class A {
+    public static void main(String[] args) {
+        System.out.println("ok");
+    }
+}
+"""
+    m = getlangparser("java").parse_code(code)
+
+    assert m.getfncnames() == ["main"]
+
+
+def test_println_nested_postinc():
+    # x++ inside a nested call is still printed before the increment
+    inter, trace = run_java("postinc2.java")
+
+    assert inter.output == "1"
+    assert trace[-1][2][prime("x")] == 2